@@ -3,30 +3,74 @@ TikTok Clip Maker - Web Application Backend
 Flask server that processes YouTube videos and creates TikTok clips
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory
+from flask.json.provider import JSONProvider
+import orjson
 import os
+import bisect
 import subprocess
-import json
+import mmap
 import re
+import shutil
 import time
+import zipfile
 import threading
+import queue
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime
 import uuid
 
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
 # Configuration
 UPLOAD_FOLDER = 'processing'
 OUTPUT_FOLDER = 'output'
 MAX_CLIPS = 10
+MAX_JOBS = 1000
+SSE_KEEPALIVE = 15
+ZIP_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_POLL_INTERVAL = 1
+
+# Jobs processed at once; further submissions wait in the queue
+JOB_WORKERS = max(1, int(os.environ.get('JOB_WORKERS', 2)))
+
+# Clips encoded in parallel per job, and ffmpeg threads for each encode
+# (cores shared across every encode of every concurrent job)
+FFMPEG_PARALLEL = max(1, int(os.environ.get('FFMPEG_PARALLEL', (os.cpu_count() or 2) // 2)))
+FFMPEG_THREADS = max(1, (os.cpu_count() or 1) // (JOB_WORKERS * FFMPEG_PARALLEL))
+
+# x264 speed/size trade-off, used when no hardware encoder is available
+X264_PRESET = os.environ.get('X264_PRESET', 'veryfast')
+
+# Concurrent NVENC encodes across all jobs (consumer GPUs cap sessions)
+NVENC_PARALLEL = max(1, int(os.environ.get('NVENC_PARALLEL', 3)))
 
 # Create folders
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-# Store job status
-jobs = {}
+# Store job status (oldest first), guarded by jobs_lock
+jobs = OrderedDict()
+jobs_lock = threading.RLock()
+
+# Notified on every job update so status streams can push changes
+jobs_changed = threading.Condition(jobs_lock)
+
+# Jobs waiting for one of the JOB_WORKERS worker threads
+job_queue = queue.Queue()
 
 # Viral keywords for detecting good moments
 VIRAL_KEYWORDS = [
@@ -37,49 +81,129 @@ VIRAL_KEYWORDS = [
     'must', 'need to', 'have to', 'warning', 'danger', 'ultimate'
 ]
 
+# TikTok-style caption script header. Sizes and margins are in script units
+# on libass's default 384x288 canvas (what SRT input gets), scaled to the
+# 1080x1920 output, so captions look the same as the old SRT + force_style.
+ASS_HEADER = (
+    "[Script Info]\n"
+    "ScriptType: v4.00+\n"
+    "PlayResX: 384\n"
+    "PlayResY: 288\n"
+    "ScaledBorderAndShadow: yes\n"
+    "\n"
+    "[V4+ Styles]\n"
+    "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, "
+    "BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+    "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n"
+    "Style: Default,Arial Black,32,&H0000E7FF,&H00FFFFFF,&H00000000,&H80000000,"
+    "-1,-1,0,0,100,100,0,0,1,4,2,2,10,10,100,1\n"
+    "\n"
+    "[Events]\n"
+    "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+)
+
+# Basic SRT markup carried over to ASS (<i>, <b>, <u>); font tags are dropped
+_SRT_STYLE_TAG_RE = re.compile(r'<(/?)([ibu])>', re.IGNORECASE)
+_SRT_FONT_TAG_RE = re.compile(r'</?font[^>]*>', re.IGNORECASE)
+
+# Keywords as matched against lowercased text, without duplicates
+_KEYWORDS_LOWER = frozenset(k.lower() for k in VIRAL_KEYWORDS)
+
+# Single alternation over all keywords (longest first), scanned once per segment
+_KEYWORD_RE = re.compile(
+    '|'.join(re.escape(k) for k in sorted(_KEYWORDS_LOWER, key=len, reverse=True))
+)
+
+# SRT subtitle block pattern (compiled once at startup). Matches raw
+# bytes so files can be scanned through mmap, with either line ending.
+_SRT_RE = re.compile(
+    rb'(\d+)\r?\n(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\r?\n(.*?)(?:\r?\n\r?\n|\Z)',
+    re.DOTALL
+)
+
 
 def srt_to_seconds(srt_time):
     """Convert SRT timestamp to seconds"""
-    time_parts = srt_time.replace(',', '.').split(':')
-    hours = int(time_parts[0])
-    minutes = int(time_parts[1])
-    seconds = float(time_parts[2])
-    return hours * 3600 + minutes * 60 + seconds
-
-
-def seconds_to_srt(seconds):
-    """Convert seconds to SRT timestamp"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+    hours, minutes, secs_millis = srt_time.split(':')
+    secs, millis = secs_millis.split(',')
+    return int(hours) * 3600 + int(minutes) * 60 + int(secs) + int(millis) / 1000
+
+
+def seconds_to_ass(seconds):
+    """Convert seconds to ASS timestamp"""
+    hours, centis = divmod(round(seconds * 100), 360000)
+    minutes, centis = divmod(centis, 6000)
+    secs, centis = divmod(centis, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centis:02d}"
+
+
+def ass_escape(text):
+    """Make caption text safe for an ASS Dialogue line"""
+    # A word joiner after each backslash stops sequences like \N or \h
+    # being read as tags, and escaped braces can't open override blocks
+    text = text.replace('\\', '\\\u2060')
+    text = text.replace('{', '\\{').replace('}', '\\}')
+    text = text.replace('\n', '\\N')
+    
+    text = _SRT_FONT_TAG_RE.sub('', text)
+    return _SRT_STYLE_TAG_RE.sub(
+        lambda m: '{\\' + m.group(2).lower() + ('0' if m.group(1) else '1') + '}',
+        text
+    )
 
 
 def parse_srt(srt_path):
     """Parse SRT subtitle file"""
-    if not os.path.exists(srt_path):
+    if not os.path.exists(srt_path) or os.path.getsize(srt_path) == 0:
         return []
     
-    with open(srt_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    # Scan the file in place and decode one cue at a time
+    transcript = []
+    with open(srt_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+        for match in _SRT_RE.finditer(content):
+            start_time = srt_to_seconds(match.group(2).decode('ascii'))
+            end_time = srt_to_seconds(match.group(3).decode('ascii'))
+            text = match.group(4).decode('utf-8').replace('\r', '').replace('\n', ' ').strip()
+            
+            transcript.append({
+                'start': start_time,
+                'end': end_time,
+                'text': text
+            })
     
-    pattern = r'(\d+)\n(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\n(.*?)(?:\n\n|\Z)'
-    matches = re.findall(pattern, content, re.DOTALL)
+    return transcript
+
+
+def update_job(job_id, **fields):
+    """Update job fields and wake any status streams"""
+    with jobs_changed:
+        jobs[job_id].update(fields)
+        if fields.get('status') in ('complete', 'error'):
+            jobs.move_to_end(job_id)
+        jobs_changed.notify_all()
     
-    transcript = []
-    for match in matches:
-        start_time = srt_to_seconds(match[1])
-        end_time = srt_to_seconds(match[2])
-        text = match[3].replace('\n', ' ').strip()
+    if fields.get('status') in ('complete', 'error'):
+        evict_old_jobs()
+
+
+def evict_old_jobs():
+    """Drop the oldest finished jobs and their files beyond MAX_JOBS"""
+    with jobs_lock:
+        excess = len(jobs) - MAX_JOBS
+        if excess <= 0:
+            return
         
-        transcript.append({
-            'start': start_time,
-            'end': end_time,
-            'text': text
-        })
+        # Jobs still queued or running are never evicted
+        evicted = [
+            old_id for old_id, job in jobs.items()
+            if job['status'] in ('complete', 'error')
+        ][:excess]
+        for old_id in evicted:
+            del jobs[old_id]
     
-    return transcript
+    for old_id in evicted:
+        shutil.rmtree(os.path.join(UPLOAD_FOLDER, old_id), ignore_errors=True)
+        shutil.rmtree(os.path.join(OUTPUT_FOLDER, old_id), ignore_errors=True)
 
 
 def get_video_duration(video_path):
@@ -97,6 +221,52 @@ def get_video_duration(video_path):
         return 0
 
 
+NVENC_ARGS = [
+    '-c:v', 'h264_nvenc',
+    '-preset', 'p4',
+    '-tune', 'hq',
+    '-rc', 'vbr',
+    '-cq', '23',
+    '-b:v', '0'
+]
+
+X264_ARGS = [
+    '-c:v', 'libx264',
+    '-preset', X264_PRESET,
+    '-crf', '23'
+]
+
+
+def detect_video_encoder():
+    """Pick NVENC if ffmpeg has it and a GPU can open it, else libx264"""
+    # A tiny test encode with the same settings as real clips, since builds
+    # list NVENC even without a GPU and older ones reject newer presets
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-f', 'lavfi', '-i', 'color=size=256x256:duration=0.1',
+        *NVENC_ARGS,
+        '-f', 'null', '-'
+    ]
+    try:
+        subprocess.run(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+            timeout=30
+        )
+        return 'h264_nvenc'
+    except Exception:
+        return 'libx264'
+
+
+# Probed once at startup and reused for every clip
+VIDEO_ENCODER = detect_video_encoder()
+
+# Shared by all jobs, since the session limit is per GPU
+nvenc_slots = threading.BoundedSemaphore(NVENC_PARALLEL)
+
+
 def detect_viral_moments(transcript, duration):
     """Detect potential viral moments in the video"""
     moments = []
@@ -114,62 +284,65 @@ def detect_viral_moments(transcript, duration):
             })
         return moments
     
-    # Analyze transcript for viral content
-    for i, segment in enumerate(transcript):
-        score = 0
-        text_lower = segment['text'].lower()
-        
-        # Check for viral keywords
-        for keyword in VIRAL_KEYWORDS:
-            if keyword in text_lower:
-                score += 0.3
-        
-        # Questions get points
-        if '?' in segment['text']:
-            score += 0.2
-        
-        # Excitement (exclamations)
-        if '!' in segment['text']:
-            score += 0.15
-        
-        # If this segment has potential
-        if score >= 0.3:
-            # Look ahead to create 60-second clip
-            end_time = segment['start'] + 60
-            if end_time > duration:
-                end_time = duration
-            
-            # Find natural ending point
-            for j in range(i, len(transcript)):
-                if transcript[j]['end'] >= end_time:
-                    end_time = transcript[j]['end']
-                    break
-            
-            clip_duration = end_time - segment['start']
-            
-            # Prefer 45-75 second clips
-            if 45 <= clip_duration <= 75:
-                moments.append({
-                    'start': segment['start'],
-                    'end': end_time,
-                    'score': score,
-                    'text': segment['text'][:100]
-                })
+    # Score every segment up front in one pass
+    texts_lower = [segment['text'].lower() for segment in transcript]
+    scores = [
+        # Viral keywords (each distinct keyword counts once), questions
+        # and excitement (exclamations)
+        0.3 * len(set(_KEYWORD_RE.findall(text_lower)))
+        + (0.2 if '?' in text_lower else 0)
+        + (0.15 if '!' in text_lower else 0)
+        for text_lower in texts_lower
+    ]
+    
+    # Only segments with potential go on to clip building
+    candidates = [i for i, score in enumerate(scores) if score >= 0.3]
+    
+    for i in candidates:
+        segment = transcript[i]
+        
+        # Look ahead to create 60-second clip
+        end_time = segment['start'] + 60
+        if end_time > duration:
+            end_time = duration
+        
+        # Find natural ending point
+        for j in range(i, len(transcript)):
+            if transcript[j]['end'] >= end_time:
+                end_time = transcript[j]['end']
+                break
+        
+        clip_duration = end_time - segment['start']
+        
+        # Prefer 45-75 second clips
+        if 45 <= clip_duration <= 75:
+            moments.append({
+                'start': segment['start'],
+                'end': end_time,
+                'score': scores[i],
+                'text': segment['text'][:100]
+            })
     
     # Sort by score and remove overlaps
     moments.sort(key=lambda x: x['score'], reverse=True)
     
     filtered = []
+    # Selected intervals never overlap, so kept sorted by start they are
+    # sorted by end too and only the neighbours of a new moment can clash
+    selected_starts = []
+    selected_ends = []
     for moment in moments:
-        # Check for overlap with already selected moments
-        overlap = False
-        for selected in filtered:
-            if moment['start'] < selected['end'] and moment['end'] > selected['start']:
-                overlap = True
-                break
+        pos = bisect.bisect_right(selected_starts, moment['start'])
+        
+        # Check for overlap with the selected moments either side
+        if pos > 0 and selected_ends[pos - 1] > moment['start']:
+            continue
+        if pos < len(selected_starts) and selected_starts[pos] < moment['end']:
+            continue
         
-        if not overlap:
-            filtered.append(moment)
+        selected_starts.insert(pos, moment['start'])
+        selected_ends.insert(pos, moment['end'])
+        filtered.append(moment)
         
         if len(filtered) >= MAX_CLIPS:
             break
@@ -177,70 +350,146 @@ def detect_viral_moments(transcript, duration):
     return filtered
 
 
-def create_clip(video_path, start_time, end_time, output_path, transcript):
+def escape_filter_path(path):
+    """Escape a file path for use as an ffmpeg filter option value"""
+    # Escape once for the filter's option parser, then again for the
+    # filtergraph parser (see "Notes on filtergraph escaping" in ffmpeg docs)
+    for char in "\\':":
+        path = path.replace(char, '\\' + char)
+    for char in "\\'[],;":
+        path = path.replace(char, '\\' + char)
+    return path
+
+
+def create_clip(video_path, start_time, end_time, output_path, transcript, caption_starts):
     """Create a TikTok-style clip with captions"""
     
-    # Get captions for this time range
-    clip_captions = [
-        seg for seg in transcript 
-        if seg['start'] >= start_time and seg['end'] <= end_time
-    ]
+    # Get captions for this time range (caption_starts holds each
+    # transcript segment's start, in order, for binary search)
+    lo = bisect.bisect_left(caption_starts, start_time)
+    hi = bisect.bisect_right(caption_starts, end_time)
+    clip_captions = [seg for seg in transcript[lo:hi] if seg['end'] <= end_time]
     
-    # Create SRT file for this clip
-    srt_path = output_path.replace('.mp4', '.srt')
-    with open(srt_path, 'w', encoding='utf-8') as f:
-        for idx, caption in enumerate(clip_captions, 1):
-            adjusted_start = caption['start'] - start_time
-            adjusted_end = caption['end'] - start_time
-            
-            f.write(f"{idx}\n")
-            f.write(f"{seconds_to_srt(adjusted_start)} --> {seconds_to_srt(adjusted_end)}\n")
-            f.write(f"{caption['text']}\n\n")
+    # Create ASS subtitle file for this clip, with the caption style built in
+    ass_path = str(Path(output_path).with_suffix('.ass'))
+    ass_lines = [ASS_HEADER]
+    for caption in clip_captions:
+        adjusted_start = caption['start'] - start_time
+        adjusted_end = caption['end'] - start_time
+        text = ass_escape(caption['text'])
+        
+        ass_lines.append(
+            f"Dialogue: 0,{seconds_to_ass(adjusted_start)},{seconds_to_ass(adjusted_end)},"
+            f"Default,,0,0,0,,{text}\n"
+        )
     
-    # Create the clip with TikTok-style captions
-    cmd = [
-        'ffmpeg', '-i', video_path,
+    Path(ass_path).write_text(''.join(ass_lines), encoding='utf-8')
+    
+    # Create the clip with TikTok-style captions. Seeking before -i jumps
+    # straight to start_time in the demuxer instead of decoding up to it,
+    # and restarts timestamps at 0 to match the clip-relative captions.
+    input_args = [
+        'ffmpeg', '-nostats', '-loglevel', 'error',
         '-ss', str(start_time),
+        '-i', video_path,
         '-t', str(end_time - start_time),
         '-vf', (
             "scale=1080:1920:force_original_aspect_ratio=increase,"
             "crop=1080:1920,"
-            f"subtitles='{srt_path}':force_style='"
-            "FontName=Arial Black,"
-            "FontSize=32,"
-            "PrimaryColour=&H0000E7FF,"
-            "OutlineColour=&H00000000,"
-            "BackColour=&H80000000,"
-            "BorderStyle=1,"
-            "Outline=4,"
-            "Shadow=2,"
-            "MarginV=100,"
-            "Alignment=2,"
-            "Bold=-1,"
-            "Italic=-1'"
-        ),
-        '-c:v', 'libx264',
-        '-preset', 'medium',
-        '-crf', '23',
+            f"ass={escape_filter_path(ass_path)}"
+        )
+    ]
+    output_args = [
         '-c:a', 'aac',
         '-b:a', '128k',
+        '-threads', str(FFMPEG_THREADS),
         '-y',
         output_path
     ]
     
+    if VIDEO_ENCODER == 'h264_nvenc':
+        # GPUs limit concurrent NVENC sessions, so wait for a free one and
+        # fall back to libx264 if the GPU encode still fails
+        with nvenc_slots:
+            if run_ffmpeg([*input_args, *NVENC_ARGS, *output_args]):
+                return True
+        print("NVENC encode failed, retrying with libx264")
+    
+    return run_ffmpeg([*input_args, *X264_ARGS, *output_args])
+
+
+def run_ffmpeg(cmd):
+    """Run an ffmpeg clip encode, returning whether it succeeded"""
+    # Only stderr is kept, and only errors are logged to it, so long
+    # encodes don't pile up progress output in memory
     try:
-        subprocess.run(cmd, capture_output=True, check=True)
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
         return True
+    except subprocess.CalledProcessError as e:
+        print(f"Error creating clip: {e}\n{e.stderr.decode(errors='replace')[-2000:]}")
+        return False
     except Exception as e:
         print(f"Error creating clip: {e}")
         return False
 
 
+def analyze_video(video_path, probe=True):
+    """Get title, transcript and viral moments from a download's sidecar files
+    
+    Returns (video_path, title, transcript, moments), or None if probe is
+    False and the metadata has no duration.
+    """
+    srt_path = str(Path(video_path).with_suffix('.en.srt'))
+    transcript = parse_srt(srt_path)
+    
+    info_file = str(Path(video_path).with_suffix('.info.json'))
+    info = {}
+    if os.path.exists(info_file):
+        with open(info_file, 'rb') as f:
+            info = orjson.loads(f.read())
+    
+    video_title = info.get('title', 'Video')
+    
+    # Only probe the file when the metadata has no duration
+    duration = info.get('duration')
+    if not duration:
+        if not probe:
+            return None
+        duration = get_video_duration(video_path)
+    
+    moments = detect_viral_moments(transcript, float(duration))
+    return video_path, video_title, transcript, moments
+
+
+def find_partial_download(job_folder):
+    """Get the video path of a download that can be analyzed early
+    
+    Returns None until yt-dlp has moved on to the media with the info.json
+    and converted subtitles in place.
+    """
+    folder = Path(job_folder)
+    
+    # Media fragments only appear after info.json and subtitles are done
+    media_parts = [
+        part for part in folder.glob('*.part')
+        if not part.name.endswith(('.vtt.part', '.srt.part'))
+    ]
+    info_files = list(folder.glob('*.info.json'))
+    if not media_parts or not info_files:
+        return None
+    
+    # The merged video will be saved as <id>.mp4 next to its info.json
+    video_path = str(info_files[0]).removesuffix('.info.json') + '.mp4'
+    if not os.path.exists(str(Path(video_path).with_suffix('.en.srt'))):
+        return None
+    
+    return video_path
+
+
 def process_video_job(job_id, youtube_url):
     """Background job to process video"""
     try:
-        jobs[job_id]['status'] = 'downloading'
-        jobs[job_id]['progress'] = 10
+        update_job(job_id, status='downloading', progress=10)
         
         # Create job folder
         job_folder = os.path.join(UPLOAD_FOLDER, job_id)
@@ -257,10 +506,41 @@ def process_video_job(job_id, youtube_url):
             '--write-auto-sub',
             '--sub-lang', 'en',
             '--convert-subs', 'srt',
+            '--no-playlist',
             youtube_url
         ]
         
-        subprocess.run(cmd, check=True, capture_output=True)
+        # yt-dlp writes the info.json and subtitles before it fetches the
+        # media, so the analysis can run while the video downloads
+        # (progress output is discarded, stderr is kept for diagnosis)
+        process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        analysis = None
+        early_attempted = False
+        try:
+            while True:
+                try:
+                    _, stderr = process.communicate(timeout=DOWNLOAD_POLL_INTERVAL)
+                    break
+                except subprocess.TimeoutExpired:
+                    early_path = None if early_attempted else find_partial_download(job_folder)
+                    if early_path is None:
+                        continue
+                    
+                    # Try once; on failure the analysis after the download
+                    # handles it, rather than aborting a healthy download
+                    early_attempted = True
+                    try:
+                        analysis = analyze_video(early_path, probe=False)
+                    except Exception as e:
+                        print(f"Early analysis failed for job {job_id}: {e}")
+        except Exception:
+            process.kill()
+            process.wait()
+            raise
+        
+        if process.returncode != 0:
+            print(f"yt-dlp failed for job {job_id}:\n{stderr.decode(errors='replace')[-2000:]}")
+            raise subprocess.CalledProcessError(process.returncode, cmd, stderr=stderr)
         
         # Find downloaded video
         video_files = list(Path(job_folder).glob('*.mp4'))
@@ -269,78 +549,177 @@ def process_video_job(job_id, youtube_url):
         
         video_path = str(video_files[0])
         
-        jobs[job_id]['status'] = 'analyzing'
-        jobs[job_id]['progress'] = 30
-        
-        # Get video info
-        duration = get_video_duration(video_path)
-        srt_path = video_path.replace('.mp4', '.en.srt')
-        transcript = parse_srt(srt_path)
+        update_job(job_id, status='analyzing', progress=30)
         
-        # Get video title
-        info_file = video_path.replace('.mp4', '.info.json')
-        video_title = "Video"
-        if os.path.exists(info_file):
-            with open(info_file, 'r') as f:
-                info = json.load(f)
-                video_title = info.get('title', 'Video')
+        # The early analysis only counts if it was of the video being cut
+        if analysis is None or analysis[0] != video_path:
+            analysis = analyze_video(video_path)
         
-        jobs[job_id]['video_title'] = video_title
+        _, video_title, transcript, moments = analysis
         
-        # Detect viral moments
-        moments = detect_viral_moments(transcript, duration)
+        update_job(job_id, video_title=video_title)
         
         if not moments:
             raise Exception("No viral moments detected")
         
-        jobs[job_id]['status'] = 'creating_clips'
-        jobs[job_id]['total_clips'] = len(moments)
-        jobs[job_id]['progress'] = 40
+        update_job(job_id, status='creating_clips', total_clips=len(moments), progress=40)
         
         # Create output folder for this job
         output_folder = os.path.join(OUTPUT_FOLDER, job_id)
         os.makedirs(output_folder, exist_ok=True)
         
-        # Create each clip
-        created_clips = []
+        # Segment start times, shared by every clip's caption lookup
+        caption_starts = [seg['start'] for seg in transcript]
+        
+        # Create clips in parallel (each one is a separate ffmpeg process).
+        # Daemon threads, like the job workers, so exit isn't held up.
+        pending = queue.Queue()
+        finished = queue.Queue()
         for idx, moment in enumerate(moments, 1):
-            output_filename = f"clip_{idx}.mp4"
-            output_path = os.path.join(output_folder, output_filename)
-            
-            success = create_clip(
-                video_path,
-                moment['start'],
-                moment['end'],
-                output_path,
-                transcript
-            )
+            pending.put((idx, moment))
+        
+        def encode_clips():
+            while True:
+                try:
+                    idx, moment = pending.get_nowait()
+                except queue.Empty:
+                    return
+                
+                output_path = os.path.join(output_folder, f"clip_{idx}.mp4")
+                try:
+                    result = create_clip(
+                        video_path,
+                        moment['start'],
+                        moment['end'],
+                        output_path,
+                        transcript,
+                        caption_starts
+                    )
+                except Exception as e:
+                    result = e
+                finished.put((idx, moment, result))
+        
+        for _ in range(min(FFMPEG_PARALLEL, len(moments))):
+            threading.Thread(target=encode_clips, daemon=True).start()
+        
+        clips_by_index = {}
+        for done in range(1, len(moments) + 1):
+            idx, moment, result = finished.get()
+            if isinstance(result, Exception):
+                raise result
             
-            if success:
+            if result:
+                output_filename = f"clip_{idx}.mp4"
+                output_path = os.path.join(output_folder, output_filename)
                 file_size = os.path.getsize(output_path) / (1024 * 1024)
-                created_clips.append({
+                clips_by_index[idx] = {
                     'filename': output_filename,
                     'duration': int(moment['end'] - moment['start']),
                     'size_mb': round(file_size, 1),
                     'preview_text': moment.get('text', '')[:80]
-                })
+                }
             
             # Update progress
-            progress = 40 + int((idx / len(moments)) * 50)
-            jobs[job_id]['progress'] = progress
-            jobs[job_id]['clips_created'] = idx
+            progress = 40 + int((done / len(moments)) * 50)
+            update_job(job_id, progress=progress, clips_created=done)
+        
+        created_clips = [clips_by_index[idx] for idx in sorted(clips_by_index)]
         
         # Complete
-        jobs[job_id]['status'] = 'complete'
-        jobs[job_id]['progress'] = 100
-        jobs[job_id]['clips'] = created_clips
-        jobs[job_id]['completed_at'] = datetime.now().isoformat()
+        update_job(
+            job_id,
+            status='complete',
+            progress=100,
+            clips=created_clips,
+            completed_at=datetime.now().isoformat()
+        )
         
     except Exception as e:
-        jobs[job_id]['status'] = 'error'
-        jobs[job_id]['error'] = str(e)
+        update_job(job_id, status='error', error=str(e))
         print(f"Error processing job {job_id}: {e}")
 
 
+def job_worker():
+    """Run queued jobs one after another"""
+    while True:
+        job_id, youtube_url = job_queue.get()
+        process_video_job(job_id, youtube_url)
+
+
+# Daemon threads, so stopping the server doesn't wait for queued jobs
+for _ in range(JOB_WORKERS):
+    threading.Thread(target=job_worker, daemon=True).start()
+
+
+class ZipStreamBuffer:
+    """Write-only file object that collects zip output until it is taken"""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_zip(files):
+    """Yield a zip archive of (path, arcname) files chunk by chunk"""
+    buffer = ZipStreamBuffer()
+    # mp4 is already compressed, so store it as-is rather than deflating
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED, allowZip64=True) as zip_file:
+        for file_path, arcname in files:
+            zip_info = zipfile.ZipInfo.from_file(file_path, arcname)
+            zip_info.compress_type = zip_file.compression
+            
+            with open(file_path, 'rb') as src, zip_file.open(zip_info, 'w') as dest:
+                while True:
+                    chunk = src.read(ZIP_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dest.write(chunk)
+                    
+                    data = buffer.take()
+                    if data:
+                        yield data
+    
+    # Remaining entry trailer and central directory
+    yield buffer.take()
+
+
+def zip_stream_size(files):
+    """Get the exact size of the archive stream_zip builds for files"""
+    # Mirrors zipfile's layout for stored entries on an unseekable stream:
+    # local header, data and data descriptor per file, then the central
+    # directory and end record (with ZIP64 fields past the size limits)
+    offset = 0
+    central_size = 0
+    for file_path, arcname in files:
+        file_size = os.path.getsize(file_path)
+        name_size = len(arcname.encode('utf-8'))
+        zip64 = file_size * 1.05 > zipfile.ZIP64_LIMIT
+        
+        zip64_fields = 2 * (file_size > zipfile.ZIP64_LIMIT) + (offset > zipfile.ZIP64_LIMIT)
+        central_size += 46 + name_size + (4 + 8 * zip64_fields if zip64_fields else 0)
+        
+        offset += 30 + name_size + (20 if zip64 else 0) + file_size + (24 if zip64 else 16)
+    
+    end_size = 22
+    if (len(files) > zipfile.ZIP_FILECOUNT_LIMIT
+            or offset > zipfile.ZIP64_LIMIT
+            or central_size > zipfile.ZIP64_LIMIT):
+        end_size += 56 + 20
+    
+    return offset + central_size + end_size
+
+
 @app.route('/')
 def index():
     """Serve the main page"""
@@ -361,18 +740,17 @@ def process_video():
     
     # Create job
     job_id = str(uuid.uuid4())
-    jobs[job_id] = {
-        'id': job_id,
-        'url': youtube_url,
-        'status': 'queued',
-        'progress': 0,
-        'created_at': datetime.now().isoformat()
-    }
-    
-    # Start processing in background
-    thread = threading.Thread(target=process_video_job, args=(job_id, youtube_url))
-    thread.daemon = True
-    thread.start()
+    with jobs_lock:
+        jobs[job_id] = {
+            'id': job_id,
+            'url': youtube_url,
+            'status': 'queued',
+            'progress': 0,
+            'created_at': datetime.now().isoformat()
+        }
+    
+    # Queue for processing in background
+    job_queue.put((job_id, youtube_url))
     
     return jsonify({'job_id': job_id})
 
@@ -380,10 +758,52 @@ def process_video():
 @app.route('/api/status/<job_id>')
 def get_status(job_id):
     """Get job status"""
-    if job_id not in jobs:
+    with jobs_lock:
+        job = jobs.get(job_id)
+        job = dict(job) if job else None
+    
+    if job is None:
         return jsonify({'error': 'Job not found'}), 404
     
-    return jsonify(jobs[job_id])
+    return jsonify(job)
+
+
+@app.route('/api/events/<job_id>')
+def stream_status(job_id):
+    """Stream job status as server-sent events until the job finishes"""
+    with jobs_lock:
+        if job_id not in jobs:
+            return jsonify({'error': 'Job not found'}), 404
+    
+    def generate():
+        last_sent = None
+        while True:
+            with jobs_changed:
+                if jobs.get(job_id) == last_sent:
+                    jobs_changed.wait(timeout=SSE_KEEPALIVE)
+                job = jobs.get(job_id)
+                job = dict(job) if job else None
+            
+            if job is None:
+                # Job was evicted
+                break
+            
+            if job == last_sent:
+                # Nothing changed, keep the connection open
+                yield ': keepalive\n\n'
+                continue
+            
+            last_sent = job
+            yield f"data: {orjson.dumps(job).decode()}\n\n"
+            
+            if job['status'] in ('complete', 'error'):
+                break
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache'}
+    )
 
 
 @app.route('/api/download/<job_id>/<filename>')
@@ -396,29 +816,25 @@ def download_clip(job_id, filename):
 @app.route('/api/download-all/<job_id>')
 def download_all(job_id):
     """Download all clips as a zip"""
-    import zipfile
-    import io
-    
     output_folder = os.path.join(OUTPUT_FOLDER, job_id)
     
     if not os.path.exists(output_folder):
         return jsonify({'error': 'Job not found'}), 404
     
-    # Create zip in memory
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for filename in os.listdir(output_folder):
-            if filename.endswith('.mp4'):
-                file_path = os.path.join(output_folder, filename)
-                zip_file.write(file_path, filename)
-    
-    zip_buffer.seek(0)
+    clip_files = [
+        (os.path.join(output_folder, filename), filename)
+        for filename in sorted(os.listdir(output_folder))
+        if filename.endswith('.mp4')
+    ]
     
-    return send_file(
-        zip_buffer,
+    # Stream the zip as it is built instead of holding it all in memory
+    return Response(
+        stream_zip(clip_files),
         mimetype='application/zip',
-        as_attachment=True,
-        download_name=f'tiktok_clips_{job_id}.zip'
+        headers={
+            'Content-Disposition': f'attachment; filename=tiktok_clips_{job_id}.zip',
+            'Content-Length': str(zip_stream_size(clip_files))
+        }
     )
 
 